@@ -0,0 +1,29 @@
+import pytest
+from urdfenvs.sensors import lidar
+from urdfenvs.urdf_common import urdf_env
+
+
+@pytest.fixture(params=["numba", "numpy"])
+def quaternion_backend(request, monkeypatch):
+    """Runs a test with each implementation of the quaternion conversions.
+
+    The numba kernel is skipped if numba is not installed.
+    """
+    if request.param == "numba":
+        if urdf_env.quat_to_rot is None:
+            pytest.skip("numba is not installed")
+        return request.param
+    monkeypatch.setattr(urdf_env, "quat_to_rot", None)
+    return request.param
+
+
+@pytest.fixture(params=["numba", "numpy"])
+def kernel_backend(request, monkeypatch):
+    """Runs a test with and without the numba compiled kernels."""
+    if request.param == "numba":
+        if lidar._hit_positions_kernel is None:
+            pytest.skip("numba is not installed")
+        return request.param
+    monkeypatch.setattr(lidar, "_hit_positions_kernel", None)
+    monkeypatch.setattr(urdf_env, "_first_out_of_bounds_kernel", None)
+    return request.param
@@ -0,0 +1,130 @@
+import gymnasium as gym
+import numpy as np
+import pybullet as p
+import pytest
+from urdfenvs.robots.generic_urdf import GenericUrdfReacher
+
+
+@pytest.fixture
+def panda_env():
+    robots = [
+        GenericUrdfReacher(urdf="panda_collision_links.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False, observation_checking=False
+    )
+    env.reset()
+    yield env
+    env.close()
+
+
+def local_transformation(index: int) -> np.ndarray:
+    transformation = np.identity(4)
+    angle = 0.3 * (index + 1)
+    transformation[:3, :3] = [
+        [np.cos(angle), -np.sin(angle), 0.0],
+        [np.sin(angle), np.cos(angle), 0.0],
+        [0.0, 0.0, 1.0],
+    ]
+    transformation[:3, 3] = [0.05 * index, 0.02, -0.1]
+    return transformation
+
+
+def expected_pose(robot: int, link: int, transformation: np.ndarray):
+    link_state = p.getLinkState(robot, link)
+    link_transformation = np.identity(4)
+    link_transformation[:3, :3] = np.array(
+        p.getMatrixFromQuaternion(link_state[1])
+    ).reshape(3, 3)
+    link_transformation[:3, 3] = link_state[0]
+    return link_transformation @ transformation
+
+
+@pytest.mark.usefixtures("quaternion_backend")
+def test_collision_links_poses(panda_env):
+    env = panda_env.unwrapped
+    robot = env._robots[0]._robot
+    links = [2, 4, 7]
+    bullet_ids = []
+    for index, link in enumerate(links):
+        bullet_ids.append(
+            env.add_collision_link(
+                robot_index=0,
+                link_index=link,
+                shape_type="capsule",
+                size=[0.05, 0.1],
+                link_transformation=local_transformation(index),
+            )
+        )
+    action = np.ones(env.n()) * 0.3
+    for _ in range(5):
+        env.step(action)
+    # The collision links follow the link states before the last simulation
+    # step.
+    expected_poses = [
+        expected_pose(robot, link, local_transformation(index))
+        for index, link in enumerate(links)
+    ]
+    env.step(action)
+    env.add_collision_link(
+        robot_index=0, link_index=8, link_transformation=local_transformation(3)
+    )
+    poses = env.collision_links_poses()
+    positions = env.collision_links_poses(position_only=True)
+    for link, bullet_id, expected in zip(links, bullet_ids, expected_poses):
+        key = f"0_{link}_0"
+        assert np.allclose(poses[key], expected)
+        assert np.allclose(positions[key], expected[:3, 3])
+        body_position, body_orientation = p.getBasePositionAndOrientation(
+            bullet_id
+        )
+        body_rotation = np.array(
+            p.getMatrixFromQuaternion(body_orientation)
+        ).reshape(3, 3)
+        assert np.allclose(body_position, expected[:3, 3])
+        assert np.allclose(body_rotation, expected[:3, :3])
+    assert poses["0_8_0"] is None
+    assert positions["0_8_0"] is None
+
+
+def test_collision_links_positions_are_live_views(panda_env):
+    env = panda_env.unwrapped
+    env.add_collision_link(
+        robot_index=0, link_index=7, link_transformation=local_transformation(0)
+    )
+    action = np.ones(env.n()) * 0.3
+    env.step(action)
+    positions = env.collision_links_poses(position_only=True)
+    position = positions["0_7_0"]
+    position_copy = position.copy()
+    with pytest.raises(ValueError):
+        position[0] = 0.0
+    positions["0_7_0"] = None
+    env.step(action)
+    # The stored view follows the link, the copy keeps the old position.
+    assert not np.allclose(position, position_copy)
+    new_positions = env.collision_links_poses(position_only=True)
+    assert new_positions["0_7_0"] is not None
+    assert np.allclose(new_positions["0_7_0"], position)
+
+
+def test_collision_links_positions_invalidated_by_new_links(panda_env):
+    env = panda_env.unwrapped
+    env.add_collision_link(
+        robot_index=0, link_index=7, link_transformation=local_transformation(0)
+    )
+    action = np.ones(env.n()) * 0.3
+    env.step(action)
+    stale_position = env.collision_links_poses(position_only=True)["0_7_0"]
+    stale_copy = stale_position.copy()
+    env.add_collision_link(
+        robot_index=0, link_index=4, link_transformation=local_transformation(1)
+    )
+    env.step(action)
+    # Views returned before add_collision_link are no longer updated.
+    assert np.array_equal(stale_position, stale_copy)
+    position = env.collision_links_poses(position_only=True)["0_7_0"]
+    assert not np.allclose(position, stale_position)
+    env.step(action)
+    assert not np.allclose(position, stale_position)
@@ -0,0 +1,58 @@
+import gymnasium as gym
+import numpy as np
+from urdfenvs.sensors import free_space_decomposition
+from urdfenvs.sensors.free_space_decomposition import (
+    FreeSpaceDecompositionSensor,
+)
+
+from urdfenvs.scene_examples.obstacles import sphereObst1
+from urdfenvs.robots.generic_urdf import GenericUrdfReacher
+
+
+def test_constraint_lines_are_replaced(monkeypatch):
+    robots = [
+        GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False
+    )
+    env.reset()
+    env.add_obstacle(sphereObst1)
+    sensor = FreeSpaceDecompositionSensor(
+        "mobile_joint_theta",
+        nb_rays=16,
+        max_radius=10,
+        plotting_interval=1,
+    )
+    env.add_sensor(sensor, [0])
+    env.set_spaces()
+    # Bullet returns -1 for debug items without a GUI, unique ids are
+    # handed out here to follow which lines are removed.
+    line_ids = iter(range(1000))
+    added = []
+    removed = []
+
+    def add_line(*args, **kwargs):
+        added.append(next(line_ids))
+        return added[-1]
+
+    def remove_all():
+        raise AssertionError("other debug items must be kept")
+
+    monkeypatch.setattr(free_space_decomposition.p, "addUserDebugLine", add_line)
+    monkeypatch.setattr(
+        free_space_decomposition.p, "removeUserDebugItem", removed.append
+    )
+    monkeypatch.setattr(
+        free_space_decomposition.p, "removeAllUserDebugItems", remove_all
+    )
+    action = np.zeros(env.n())
+    env.step(action)
+    first_lines = list(added)
+    assert first_lines
+    assert not removed
+    env.step(action)
+    assert removed == first_lines
+    assert sensor._constraint_line_ids == added[len(first_lines):]
+    env.close()
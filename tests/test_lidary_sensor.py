@@ -1,6 +1,7 @@
 import gymnasium as gym
 import numpy as np
 import pytest
+from urdfenvs.sensors import lidar
 from urdfenvs.sensors.lidar import Lidar
 
 from urdfenvs.scene_examples.obstacles import sphereObst1, dynamicSphereObst3
@@ -8,7 +9,7 @@ from urdfenvs.scene_examples.goal import goal1
 from urdfenvs.robots.generic_urdf import GenericUrdfReacher
 
 
-def test_full_sensor():
+def test_full_sensor(kernel_backend):
     robots = [
         GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
     ]
@@ -29,3 +30,124 @@ def test_full_sensor():
     assert isinstance(lidar_sensor_ob, np.ndarray)
     env.close()
 
+
+
+def test_lidar_on_first_link(kernel_backend):
+    robots = [
+        GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False
+    )
+    env.reset()
+    env.add_obstacle(sphereObst1)
+    sensor = Lidar(0)
+    env.add_sensor(sensor, [0])
+    env.set_spaces()
+    action = np.random.random(env.n())
+    for _ in range(2):
+        ob, *_ = env.step(action)
+    lidar_sensor_ob = ob['robot_0']['LidarSensor']
+    assert sensor._link_id == 0
+    assert isinstance(lidar_sensor_ob, np.ndarray)
+    env.close()
+
+
+@pytest.mark.parametrize("visualize", [True, False])
+def test_lidar_visualization_switch(kernel_backend, monkeypatch, visualize):
+    robots = [
+        GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False
+    )
+    env.reset()
+    env.add_obstacle(sphereObst1)
+    sensor = Lidar(4, raw_data=False, visualize=visualize)
+    env.add_sensor(sensor, [0])
+    env.set_spaces()
+    debug_points = []
+
+    def add_debug_points(*args, **kwargs):
+        debug_points.append(kwargs)
+        return -1
+
+    monkeypatch.setattr(lidar.p, "addUserDebugPoints", add_debug_points)
+    action = np.random.random(env.n())
+    ob, *_ = env.step(action)
+    lidar_sensor_ob = ob['robot_0']['LidarSensor']
+    assert lidar_sensor_ob.shape == (20,)
+    assert len(debug_points) == int(visualize)
+    env.close()
+
+
+def test_lidar_in_empty_scene(kernel_backend, monkeypatch):
+    robots = [
+        GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False
+    )
+    env.reset()
+    sensor = Lidar(4, ray_length=1.0)
+    env.add_sensor(sensor, [0])
+    env.set_spaces()
+    ray_tests = []
+    ray_test_batch = lidar.p.rayTestBatch
+
+    def counting_ray_test_batch(*args, **kwargs):
+        ray_tests.append(args)
+        return ray_test_batch(*args, **kwargs)
+
+    monkeypatch.setattr(lidar.p, "rayTestBatch", counting_ray_test_batch)
+    action = np.random.random(env.n())
+    for _ in range(2):
+        ob, *_ = env.step(action)
+    lidar_sensor_ob = ob['robot_0']['LidarSensor']
+    # Nothing overlaps with the ray fan, so the ray test is skipped.
+    assert not ray_tests
+    assert np.allclose(lidar_sensor_ob, 1.0)
+    env.close()
+
+
+def test_lidar_backends_agree(monkeypatch):
+    if lidar._hit_positions_kernel is None:
+        pytest.skip("numba is not installed")
+    robots = [
+        GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False
+    )
+    env.reset(pos=np.array([1.0, 0.1, 0.3]))
+    env.add_obstacle(sphereObst1)
+    sensor = Lidar(4, nb_rays=16, raw_data=False, visualize=False)
+    env.add_sensor(sensor, [0])
+    env.set_spaces()
+    robot = env.unwrapped._robots[0]._robot
+    compiled = sensor.sense(robot, {}, {}, 0.0).copy()
+    monkeypatch.setattr(lidar, "_hit_positions_kernel", None)
+    fallback = sensor.sense(robot, {}, {}, 0.0).copy()
+    assert np.any(np.abs(compiled) < sensor._ray_length - 1e-6)
+    assert np.allclose(compiled, fallback)
+    env.close()
+
+
+def test_set_angle_limits():
+    sensor = Lidar(4, nb_rays=8)
+    thetas = sensor._thetas
+    cos_thetas = sensor._cos_thetas
+    sin_thetas = sensor._sin_thetas
+    angle_limits = np.array([-1.0, 2.0])
+    sensor.set_angle_limits(angle_limits)
+    expected = np.linspace(-1.0, 2.0, 8, endpoint=False)
+    assert sensor._thetas is thetas
+    assert sensor._cos_thetas is cos_thetas
+    assert sensor._sin_thetas is sin_thetas
+    assert np.allclose(sensor._thetas, expected)
+    assert np.allclose(sensor._cos_thetas, np.cos(expected))
+    assert np.allclose(sensor._sin_thetas, np.sin(expected))
@@ -0,0 +1,48 @@
+import gymnasium as gym
+import numpy as np
+import pytest
+from urdfenvs.robots.generic_urdf import GenericUrdfReacher
+from urdfenvs.urdf_common.urdf_env import (
+    observation_in_bounds,
+    observation_space_leaves,
+)
+
+pytestmark = pytest.mark.usefixtures("kernel_backend")
+
+
+def test_observation_space_leaves():
+    space = gym.spaces.Dict(
+        {
+            "a": gym.spaces.Box(-1, 1, shape=(2,), dtype=float),
+            "b": gym.spaces.Dict(
+                {"c": gym.spaces.Box(0, 2, shape=(3,), dtype=float)}
+            ),
+            "d": gym.spaces.Discrete(3),
+        }
+    )
+    leaves = observation_space_leaves(space)
+    assert [path for path, *_ in leaves] == [("a",), ("b", "c")]
+    observation = {"a": np.zeros(2), "b": {"c": np.ones(3)}, "d": 1}
+    assert observation_in_bounds(observation, leaves)
+    observation["b"]["c"][1] = np.nan
+    assert not observation_in_bounds(observation, leaves)
+    observation["b"]["c"][1] = 3.0
+    assert not observation_in_bounds(observation, leaves)
+    observation["b"]["c"] = np.ones(2)
+    assert not observation_in_bounds(observation, leaves)
+    assert not observation_in_bounds({"a": np.zeros(2)}, leaves)
+
+
+def test_observation_out_of_limits():
+    robots = [
+        GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False
+    )
+    env.reset(pos=np.array([100.0, 0.0, 0.0]))
+    _, _, terminated, _, info = env.step(np.zeros(env.n()))
+    assert terminated
+    assert "observation_limits" in info
+    env.close()
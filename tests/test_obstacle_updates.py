@@ -0,0 +1,43 @@
+import gymnasium as gym
+import numpy as np
+import pybullet as p
+from urdfenvs.robots.generic_urdf import GenericUrdfReacher
+
+from urdfenvs.scene_examples.obstacles import sphereObst1, dynamicSphereObst3
+
+
+def test_only_dynamic_obstacles_follow_their_trajectory():
+    robots = [
+        GenericUrdfReacher(urdf="pointRobot.urdf", mode="vel"),
+    ]
+    env = gym.make(
+        "urdf-env-v0",
+        dt=0.01, robots=robots, render=False
+    )
+    env.reset()
+    env.add_obstacle(sphereObst1)
+    env.add_obstacle(dynamicSphereObst3)
+    env.set_spaces()
+    obstacles = env.unwrapped.get_obstacles()
+    static_id, dynamic_id = obstacles.keys()
+    static_position = np.array(p.getBasePositionAndOrientation(static_id)[0])
+    assert np.allclose(static_position, sphereObst1.position())
+    moved_position = static_position + np.array([0.5, 0.0, 0.0])
+    p.resetBasePositionAndOrientation(static_id, moved_position, (0, 0, 0, 1))
+    p.resetBasePositionAndOrientation(
+        dynamic_id, moved_position, (0, 0, 0, 1)
+    )
+    for _ in range(3):
+        env.step(np.zeros(env.n()))
+    # Static obstacles are placed once, they are not reset on every step.
+    assert np.allclose(
+        p.getBasePositionAndOrientation(static_id)[0], moved_position
+    )
+    # Dynamic obstacles are reset to their trajectory before the
+    # simulation step, which then moves them by their velocity.
+    assert np.allclose(
+        p.getBasePositionAndOrientation(dynamic_id)[0],
+        dynamicSphereObst3.position(t=env.unwrapped.t()),
+        atol=1e-3,
+    )
+    env.close()
@@ -0,0 +1,144 @@
+import numpy as np
+import pybullet as p
+import pytest
+from urdfenvs.urdf_common.urdf_env import (
+    InvalidQuaternionOrderError,
+    get_transformation_matrix,
+    matrix_to_quaternion,
+    quaternion_to_rotation_matrix,
+    rotation_matrix_to_quaternion,
+)
+
+pytestmark = pytest.mark.usefixtures("quaternion_backend")
+
+
+@pytest.fixture
+def quaternions_xyzw():
+    rng = np.random.default_rng(0)
+    quaternions = rng.normal(size=(20, 4))
+    quaternions /= np.linalg.norm(quaternions, axis=1)[:, np.newaxis]
+    # Rotations of pi around the axes exercise all branches of the
+    # matrix to quaternion conversion.
+    special = np.array(
+        [
+            [0.0, 0.0, 0.0, 1.0],
+            [1.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+        ]
+    )
+    return np.concatenate((quaternions, special))
+
+
+def test_quaternion_to_rotation_matrix(quaternions_xyzw):
+    for quaternion in quaternions_xyzw:
+        expected = np.array(p.getMatrixFromQuaternion(quaternion)).reshape(3, 3)
+        rotation_xyzw = quaternion_to_rotation_matrix(
+            quaternion.copy(), ordering="xyzw"
+        )
+        rotation_wxyz = quaternion_to_rotation_matrix(
+            quaternion[[3, 0, 1, 2]].copy(), ordering="wxyz"
+        )
+        assert np.allclose(rotation_xyzw, expected)
+        assert np.allclose(rotation_wxyz, expected)
+
+
+def test_quaternion_to_rotation_matrix_out():
+    quaternion = np.array([0.0, 0.0, 1.0, 1.0]) / np.sqrt(2)
+    out = np.zeros((3, 3))
+    result = quaternion_to_rotation_matrix(quaternion, ordering="xyzw", out=out)
+    assert result is out
+    assert np.allclose(out, [[0, -1, 0], [1, 0, 0], [0, 0, 1]])
+
+
+def test_invalid_ordering():
+    with pytest.raises(InvalidQuaternionOrderError):
+        quaternion_to_rotation_matrix(np.array([1.0, 0, 0, 0]), ordering="wzyx")
+    with pytest.raises(InvalidQuaternionOrderError):
+        matrix_to_quaternion(np.identity(4), ordering="wzyx")
+
+
+def test_transformation_round_trip(quaternions_xyzw):
+    translation = np.array([0.1, -0.2, 0.3])
+    for quaternion in quaternions_xyzw:
+        transformation = get_transformation_matrix(quaternion.copy(), translation)
+        assert np.allclose(transformation[3], [0, 0, 0, 1])
+        result_translation, result_quaternion = matrix_to_quaternion(
+            transformation, ordering="xyzw"
+        )
+        assert np.allclose(result_translation, translation)
+        # q and -q describe the same rotation.
+        assert np.isclose(abs(np.dot(result_quaternion, quaternion)), 1.0)
+
+
+def test_quaternion_is_not_modified():
+    quaternion = np.array([0.0, 0.0, 2.0, 2.0])
+    rotation = quaternion_to_rotation_matrix(quaternion, ordering="xyzw")
+    assert np.allclose(quaternion, [0.0, 0.0, 2.0, 2.0])
+    assert np.allclose(rotation, [[0, -1, 0], [1, 0, 0], [0, 0, 1]])
+
+
+def test_stacked_matrix_to_quaternion(quaternions_xyzw):
+    translations = np.arange(3 * len(quaternions_xyzw)).reshape(-1, 3)
+    transformations = np.stack(
+        [
+            get_transformation_matrix(quaternion.copy(), translation)
+            for quaternion, translation in zip(quaternions_xyzw, translations)
+        ]
+    )
+    result_translations, result_quaternions = matrix_to_quaternion(
+        transformations, ordering="xyzw"
+    )
+    assert np.allclose(result_translations, translations)
+    for result_quaternion, quaternion in zip(result_quaternions, quaternions_xyzw):
+        assert np.isclose(abs(np.dot(result_quaternion, quaternion)), 1.0)
+
+
+def test_rotation_matrix_to_quaternion(quaternions_xyzw):
+    for quaternion in quaternions_xyzw:
+        rotation = quaternion_to_rotation_matrix(quaternion, ordering="xyzw")
+        result = rotation_matrix_to_quaternion(rotation, ordering="xyzw")
+        assert np.isclose(abs(np.dot(result, quaternion)), 1.0)
+
+
+def test_rotation_matrix_to_quaternion_out(quaternions_xyzw):
+    rotations = np.stack(
+        [
+            quaternion_to_rotation_matrix(quaternion, ordering="xyzw")
+            for quaternion in quaternions_xyzw
+        ]
+    )
+    out = np.empty((len(rotations), 4))
+    for ordering, order in (("xyzw", [0, 1, 2, 3]), ("wxyz", [3, 0, 1, 2])):
+        result = rotation_matrix_to_quaternion(rotations, ordering, out=out)
+        assert result is out
+        dots = np.sum(out * quaternions_xyzw[:, order], axis=1)
+        assert np.allclose(np.abs(dots), 1.0)
+
+
+def test_stacked_quaternion_to_rotation_matrix(quaternions_xyzw):
+    stack = np.stack([quaternions_xyzw[:12], 2.0 * quaternions_xyzw[12:]])
+    rotations = quaternion_to_rotation_matrix(stack, ordering="xyzw")
+    assert rotations.shape == (2, 12, 3, 3)
+    out = np.empty((2, 12, 3, 3))
+    result = quaternion_to_rotation_matrix(
+        stack[..., [3, 0, 1, 2]], ordering="wxyz", out=out
+    )
+    assert result is out
+    for quaternion, rotation, rotation_out in zip(
+        stack.reshape(-1, 4), rotations.reshape(-1, 3, 3), out.reshape(-1, 3, 3)
+    ):
+        expected = quaternion_to_rotation_matrix(quaternion, ordering="xyzw")
+        assert np.allclose(rotation, expected)
+        assert np.allclose(rotation_out, expected)
+
+
+def test_stacked_quaternion_to_rotation_matrix_strided_out(quaternions_xyzw):
+    stack = quaternions_xyzw[:12].reshape(3, 4, 4)
+    transformations = np.zeros((3, 4, 4, 4))
+    out = transformations[..., :3, :3]
+    result = quaternion_to_rotation_matrix(stack, ordering="xyzw", out=out)
+    assert result is out
+    expected = quaternion_to_rotation_matrix(stack.reshape(-1, 4), ordering="xyzw")
+    assert np.allclose(transformations[..., :3, :3].reshape(-1, 3, 3), expected)
+    assert np.all(transformations[..., 3, :] == 0.0)
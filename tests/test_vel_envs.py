@@ -177,3 +177,21 @@ def test_allBicycleModel(allBicycleModelEnvs):
         np.testing.assert_array_almost_equal(ob['robot_0']['joint_state']['forward_velocity'][0:1], action[0:1], decimal=2)
         np.testing.assert_array_almost_equal(ob['robot_0']['joint_state']['velocity'][3:], action[2:], decimal=2)
         env.close()
+
+def test_action_out_of_limits(pointRobotEnv, kernel_backend):
+    env = gym.make(
+        "urdf-env-v0",
+        robots=[pointRobotEnv[0]],
+        render=False,
+        dt=0.01,
+        observation_checking=False,
+    )
+    env.reset(pos=pointRobotEnv[1], vel=pointRobotEnv[2])
+    action = np.zeros(env.n())
+    _, _, terminated, _, info = env.step(action)
+    assert not terminated
+    action[0] = env.action_space.high[0] + 1.0
+    _, _, terminated, _, info = env.step(action)
+    assert terminated
+    assert "action_limits" in info
+    env.close()
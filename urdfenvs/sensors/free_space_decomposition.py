@@ -15,16 +15,19 @@ class FreeSpaceDecompositionSensor(Lidar):
                  nb_rays: int=10,
                  ray_length: float=10.0,
                  angle_limits: np.ndarray = np.array([-np.pi, np.pi]),
-                 plotting_interval: int=-1):
+                 plotting_interval: int=-1,
+                 visualize: bool=True):
         super().__init__(link_name,
                          nb_rays=nb_rays,
                          ray_length=ray_length,
                          raw_data=False,
                          angle_limits=angle_limits,
+                         visualize=visualize,
                         )
         self._name = "FreeSpaceDecompSensor"
         self._plotting_interval = plotting_interval
         self._call_counter = 13
+        self._constraint_line_ids: List[int] = []
         self._fsd = FreeSpaceDecomposition(
                 np.array([0.0, 0.0, 0.0]),
                 max_radius=max_radius,
@@ -58,12 +61,19 @@ class FreeSpaceDecompositionSensor(Lidar):
         return self._fsd.asdict()
 
     def visualize_constraints(self):
+        """Replaces the lines of the previous plot by the current
+        constraints. Only the constraint lines are removed, other debug
+        items such as the lidar points are kept."""
         plot_points = self._fsd.get_points()
-        p.removeAllUserDebugItems()
+        for line_id in self._constraint_line_ids:
+            p.removeUserDebugItem(line_id)
+        self._constraint_line_ids = []
         for plot_point in plot_points:
             start_point = (plot_point[0, 0], plot_point[-1, 0], self._height)
             end_point = (plot_point[0, 1], plot_point[-1, 1], self._height)
-            p.addUserDebugLine(start_point, end_point)
+            line_id = p.addUserDebugLine(start_point, end_point)
+            if line_id >= 0:
+                self._constraint_line_ids.append(line_id)
 
 
 
@@ -1,10 +1,50 @@
 """Module for lidar sensor simulation."""
+import math
 import numpy as np
 import pybullet as p
 import gymnasium as gym
 
 from urdfenvs.sensors.sensor import Sensor
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _hit_positions_loop(
+    cos_thetas,
+    sin_thetas,
+    cos_yaw,
+    sin_yaw,
+    ray_length,
+    fractions,
+    rel_xy,
+    distances,
+):
+    """Compute relative hit positions and distances from the hit fractions.
+
+    Fuses the rotation of the ray directions by the yaw with the scaling
+    by the hit length. The loop is only used when compiled with numba,
+    for the typical small number of rays it avoids the temporaries and
+    dispatch overhead of the equivalent numpy expressions.
+    """
+    for i in range(fractions.shape[0]):
+        dir_x = cos_thetas[i] * cos_yaw - sin_thetas[i] * sin_yaw
+        dir_y = cos_thetas[i] * sin_yaw + sin_thetas[i] * cos_yaw
+        hit_length = fractions[i] * ray_length
+        rel_xy[i, 0] = hit_length * dir_x
+        rel_xy[i, 1] = hit_length * dir_y
+        distances[i] = hit_length
+
+
+_hit_positions_kernel = None
+if njit is not None:
+    _hit_positions_kernel = njit(cache=True, fastmath=True)(
+        _hit_positions_loop
+    )
+
+
 class LinkIdNotFoundError(Exception):
     pass
 
@@ -24,14 +64,37 @@ class Lidar(Sensor):
         Length of a single ray, maximum detection distance.
     _link_id: int
         Link of robot to which the lidar is connected.
-    _thetas: list
+    _thetas: np.ndarray
         Angles for which rays are emitted.
-    _rel_positions: np.ndarray
-        Relative positions of first obstacle for each ray (x, y).
+    _cos_thetas: np.ndarray
+        Cosine of the ray angles, precomputed for the ray directions.
+    _sin_thetas: np.ndarray
+        Sine of the ray angles, precomputed for the ray directions.
+    _ray_from: np.ndarray
+        Start points of all rays, reused for every batched ray test.
+    _ray_to: np.ndarray
+        End points of all rays, reused for every batched ray test.
+    _rel_xy: np.ndarray
+        Relative positions of first obstacle for each ray, one (x, y) row
+        per ray.
     _raw_data: bool
         Switch whether relative positions or raw distances are returned.
     _distance: np.ndarray
         Raw distance information for rays.
+    _visualize: bool
+        Switch whether the detections are visualized with debug points.
+    _observation_space: gym.spaces.Dict
+        Observation space of the sensor, independent of the scene.
+    _link_has_collision_shape: bool
+        Whether the lidar link itself can be hit by the rays, None until
+        the link has been inspected.
+    _debug_points_id: int
+        Bullet id of the debug points visualizing the detections, -1 if
+        not created.
+    _point_positions: np.ndarray
+        Absolute positions of the detections, one row per ray.
+    _point_colors: np.ndarray
+        Colors of the debug points, one row per ray.
     """
 
     def __init__(self,
@@ -40,24 +103,58 @@ class Lidar(Sensor):
                  ray_length=10.0,
                  raw_data=True,
                  angle_limits: np.ndarray = np.array([-np.pi, np.pi]),
+                 visualize: bool = True,
                 ):
         super().__init__("LidarSensor")
         self._nb_rays = nb_rays
         self._raw_data = raw_data
+        self._visualize = visualize
         self._ray_length = ray_length
         self._link_name = link_name
         self._link_id = None
         if isinstance(link_name, int):
             self._link_id = link_name
-        self._angle_limits = angle_limits
-        self._thetas = [
-            angle_limits[0] + i * (angle_limits[1] - angle_limits[0]) / self._nb_rays for i in range(self._nb_rays)
-        ]
-        self._rel_positions = np.zeros(2 * nb_rays)
+        self._thetas = np.empty(nb_rays)
+        self._cos_thetas = np.empty(nb_rays)
+        self._sin_thetas = np.empty(nb_rays)
+        self.set_angle_limits(angle_limits)
+        self._ray_from = np.empty((nb_rays, 3), dtype=np.float64)
+        self._ray_to = np.empty((nb_rays, 3), dtype=np.float64)
+        self._rel_xy = np.zeros((nb_rays, 2))
         self._distances = np.zeros(nb_rays)
-        self._sphere_ids = [
-            -1,
-        ] * self._nb_rays
+        self._debug_points_id = -1
+        self._point_positions = np.empty((nb_rays, 3))
+        self._point_colors = np.zeros((nb_rays, 3))
+        self._link_has_collision_shape = None
+        self._observation_space = gym.spaces.Dict(
+            {
+                self._name: gym.spaces.Box(
+                    -self._ray_length - 0.01,
+                    self._ray_length + 0.01,
+                    shape=(self.get_observation_size(),),
+                    dtype=float,
+                )
+            }
+        )
+
+    def set_angle_limits(self, angle_limits: np.ndarray) -> None:
+        """
+        Sets the angular range over which the rays are distributed.
+        The ray angles and their cosine and sine tables are recomputed in
+        place, so the field of view can be changed between steps without
+        reallocating the buffers.
+
+        Parameters
+        ------------
+        angle_limits : np.ndarray
+            Lower and upper limit of the ray angles.
+        """
+        self._angle_limits = angle_limits
+        self._thetas[:] = np.linspace(
+            angle_limits[0], angle_limits[1], self._nb_rays, endpoint=False
+        )
+        np.cos(self._thetas, out=self._cos_thetas)
+        np.sin(self._thetas, out=self._sin_thetas)
 
     def get_observation_size(self):
         """Getter for the dimension of the observation space."""
@@ -66,15 +163,10 @@ class Lidar(Sensor):
         return self._nb_rays * 2
 
     def get_observation_space(self, obstacles: dict, goals: dict):
-        """Create observation space, all observations should be inside the
-        observation space."""
-        observation_space = gym.spaces.Box(
-            -self._ray_length-0.01,
-            self._ray_length+0.01,
-            shape=(self.get_observation_size(),),
-            dtype=float,
-        )
-        return gym.spaces.Dict({self._name: observation_space})
+        """Return the observation space, all observations should be inside
+        the observation space. The space is created once in the
+        constructor as it only depends on the sensor configuration."""
+        return self._observation_space
 
     def extract_link_id(self, robot):
         number_links = p.getNumJoints(robot)
@@ -87,78 +179,109 @@ class Lidar(Sensor):
                 return
         raise LinkIdNotFoundError(f"Link with name {self._link_name} not found. Possible links are {joint_names}")
 
+    def _fan_is_empty(self, robot) -> bool:
+        """
+        Broad-phase check whether any object can be hit by the rays.
+        The axis aligned bounding box of all rays is tested against the
+        bounding boxes of all objects in bullet. The lidar link is
+        ignored if it has no collision shape. If no other object overlaps
+        with the box, no ray can hit anything and the narrow-phase ray
+        test can be skipped. The ray buffers must have been filled for the
+        current step, so this is only called from sense.
+
+        Parameters
+        ------------
+        robot : int
+            Bullet id of the robot the lidar is attached to.
+        """
+        if self._link_has_collision_shape is None:
+            self._link_has_collision_shape = (
+                len(p.getCollisionShapeData(robot, self._link_id)) > 0
+            )
+        aabb_min = np.minimum(self._ray_from[0], self._ray_to.min(axis=0))
+        aabb_max = np.maximum(self._ray_from[0], self._ray_to.max(axis=0))
+        overlapping_objects = p.getOverlappingObjects(aabb_min, aabb_max)
+        if overlapping_objects is None:
+            return True
+        for body_id, link_id in overlapping_objects:
+            if (
+                body_id == robot
+                and link_id == self._link_id
+                and not self._link_has_collision_shape
+            ):
+                continue
+            return False
+        return True
+
     def sense(self, robot, obstacles: dict, goals: dict, t: float):
         """Sense the distance toward the next object with the Lidar."""
-        if not self._link_id:
+        if self._link_id is None:
             self.extract_link_id(robot)
         link_state = p.getLinkState(robot, self._link_id)
-            
         lidar_position = link_state[0]
-        ray_start = lidar_position
         yaw = p.getEulerFromQuaternion(link_state[1])[2]
-        for i, theta in enumerate(self._thetas):
-            ray_end = np.array(ray_start) + self._ray_length * np.array(
-                [np.cos(theta + yaw), np.sin(theta + yaw), 0.0]
+        cos_yaw = math.cos(yaw)
+        sin_yaw = math.sin(yaw)
+        # Rotate the precomputed ray directions by the yaw of the link.
+        dirs_x = self._cos_thetas * cos_yaw - self._sin_thetas * sin_yaw
+        dirs_y = self._cos_thetas * sin_yaw + self._sin_thetas * cos_yaw
+        # Contiguous float64 buffers are passed to bullet without conversion.
+        self._ray_from[:] = lidar_position
+        self._ray_to[:, 0] = lidar_position[0] + self._ray_length * dirs_x
+        self._ray_to[:, 1] = lidar_position[1] + self._ray_length * dirs_y
+        self._ray_to[:, 2] = lidar_position[2]
+        if self._fan_is_empty(robot):
+            fractions = np.ones(self._nb_rays)
+        else:
+            results = p.rayTestBatch(
+                self._ray_from, self._ray_to, numThreads=0
             )
-            lidar = p.rayTest(ray_start, ray_end)
-            self._rel_positions[2 * i : 2 * i + 2] = (
-                lidar[0][2]
-                * self._ray_length
-                * np.array([np.cos(theta + yaw), np.sin(theta + yaw)])
+            fractions = np.fromiter(
+                (result[2] for result in results),
+                dtype=np.float64,
+                count=self._nb_rays,
             )
-            self._distances[i] = np.linalg.norm(
-                self._rel_positions[2 * i : 2 * i + 2]
+        if _hit_positions_kernel is not None:
+            _hit_positions_kernel(
+                self._cos_thetas,
+                self._sin_thetas,
+                cos_yaw,
+                sin_yaw,
+                self._ray_length,
+                fractions,
+                self._rel_xy,
+                self._distances,
             )
-        self.update_lidar_spheres(lidar_position)
+        else:
+            # The ray directions are unit vectors and hit fractions lie in
+            # [0, 1], so the distance is the hit length itself.
+            np.multiply(fractions, self._ray_length, out=self._distances)
+            self._rel_xy[:, 0] = self._distances * dirs_x
+            self._rel_xy[:, 1] = self._distances * dirs_y
+        if self._visualize:
+            self.update_lidar_points(lidar_position)
         if self._raw_data:
             return self._distances
-        return self._rel_positions
+        return self._rel_xy.ravel()
 
-    def init_lidar_spheres(self, lidar_position):
+    def update_lidar_points(self, lidar_position):
         """
-        Initialize the Lidar spheres to visualize the sensing in bullet.
-        The visual spheres are initialized once and then update in the
-        update function. The relative positions are augmented by a third
-        column to have a full position, including the z-coordinate.
+        Updates the debug points visualizing the sensing with lidar.
+        All detections are drawn with a single addUserDebugPoints call
+        that replaces the points of the previous step. The relative
+        positions are augmented by the height of the lidar link as
+        z-coordinate.
 
         Parameters
         ------------
         lidar_position : np.ndarray
             The position of the lidar sensor link.
         """
-        q = lidar_position
-        q_obs = self._rel_positions.reshape(self._nb_rays, 2)
-        q_obs = np.append(q_obs, np.zeros((self._nb_rays, 1)), axis=1)
-        shape_id_sphere = p.createVisualShape(
-            p.GEOM_SPHERE, radius=0.05, rgbaColor=[0.0, 0.0, 0.0, 0.8]
+        self._point_positions[:, :2] = self._rel_xy + lidar_position[:2]
+        self._point_positions[:, 2] = lidar_position[2]
+        self._debug_points_id = p.addUserDebugPoints(
+            pointPositions=self._point_positions,
+            pointColorsRGB=self._point_colors,
+            pointSize=5,
+            replaceItemUniqueId=self._debug_points_id,
         )
-        for ray_id in range(self._nb_rays):
-            body_id_sphere = p.createMultiBody(
-                baseMass=0,
-                baseCollisionShapeIndex=-1,
-                baseVisualShapeIndex=shape_id_sphere,
-                basePosition=q + q_obs[ray_id],
-            )
-            self._sphere_ids[ray_id] = body_id_sphere
-
-    def update_lidar_spheres(self, lidar_position):
-        """
-        Updates the position of the spheres visualizing the sensing with lidar.
-        If the spheres have not been initialized, the init_lidar_spheres
-        function is called.
-
-        Parameters
-        ------------
-        lidar_position : np.ndarray
-            The position of the lidar sensor link.
-        """
-        if self._sphere_ids[0] == -1:
-            self.init_lidar_spheres(lidar_position)
-        q = lidar_position
-        # Reshape and add z-values to the sensor data.
-        q_obs = self._rel_positions.reshape(self._nb_rays, 2)
-        q_obs = np.append(q_obs, np.zeros((self._nb_rays, 1)), axis=1)
-        for ray_id in range(self._nb_rays):
-            p.resetBasePositionAndOrientation(
-                int(self._sphere_ids[ray_id]), q + q_obs[ray_id], [0, 0, 0, 1]
-            )
@@ -0,0 +1,45 @@
+"""Compiled kernels for quaternion conversions.
+
+The kernels are only available if numba is installed, otherwise
+`quat_to_rot` is None and callers fall back to the numpy implementations.
+"""
+import math
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _quat_to_rot(q_xyzw, out):
+    """Write the rotation matrices of quaternions (x, y, z, w) into out.
+
+    The quaternions have the shape (n, 4) and the rotation matrices
+    (n, 3, 3). Each quaternion is normalized on the fly, the input is not
+    modified.
+    """
+    for i in range(q_xyzw.shape[0]):
+        inv_norm = 1.0 / math.sqrt(
+            q_xyzw[i, 0] * q_xyzw[i, 0]
+            + q_xyzw[i, 1] * q_xyzw[i, 1]
+            + q_xyzw[i, 2] * q_xyzw[i, 2]
+            + q_xyzw[i, 3] * q_xyzw[i, 3]
+        )
+        x = q_xyzw[i, 0] * inv_norm
+        y = q_xyzw[i, 1] * inv_norm
+        z = q_xyzw[i, 2] * inv_norm
+        w = q_xyzw[i, 3] * inv_norm
+        out[i, 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+        out[i, 0, 1] = 2.0 * (x * y - w * z)
+        out[i, 0, 2] = 2.0 * (x * z + w * y)
+        out[i, 1, 0] = 2.0 * (x * y + w * z)
+        out[i, 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+        out[i, 1, 2] = 2.0 * (y * z - w * x)
+        out[i, 2, 0] = 2.0 * (x * z - w * y)
+        out[i, 2, 1] = 2.0 * (y * z + w * x)
+        out[i, 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return out
+
+quat_to_rot = None
+if njit is not None:
+    quat_to_rot = njit(cache=True, fastmath=True)(_quat_to_rot)
@@ -7,128 +7,197 @@ import logging
 from typing import List, Union, Optional
 
 from mpscenes.obstacles.collision_obstacle import CollisionObstacle
+from mpscenes.obstacles.dynamic_obstacle import DynamicObstacle
 from mpscenes.goals.goal_composition import GoalComposition
 from mpscenes.goals.sub_goal import SubGoal
+from mpscenes.goals.dynamic_sub_goal import DynamicSubGoal
 
 from urdfenvs.urdf_common.plane import Plane
 from urdfenvs.sensors.sensor import Sensor
 from urdfenvs.urdf_common.generic_robot import GenericRobot
 from urdfenvs.urdf_common.reward import Reward
+from urdfenvs.urdf_common._quat_numba import quat_to_rot
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 
 class InvalidQuaternionOrderError(Exception):
     pass
 
 
+# Index permutations from (w, x, y, z) to the given ordering and back.
+_QUATERNION_ORDER = {
+    "wxyz": np.array([0, 1, 2, 3]),
+    "xyzw": np.array([1, 2, 3, 0]),
+}
+_QUATERNION_ORDER_INVERSE = {
+    ordering: np.argsort(order) for ordering, order in _QUATERNION_ORDER.items()
+}
+# Bottom row of all homogeneous transformation matrices.
+_HOMOGENEOUS_ROW = np.array([0.0, 0.0, 0.0, 1.0])
+# Orientation of obstacles and goals. Bullet parses a tuple of floats
+# faster than a list of ints, and lists created with tolist() faster than
+# numpy arrays.
+_IDENTITY_ORIENTATION = (0.0, 0.0, 0.0, 1.0)
+
+
 def quaternion_to_rotation_matrix(
-    quaternion: np.ndarray, ordering: str = "wxyz"
+    quaternion: np.ndarray,
+    ordering: str = "wxyz",
+    out: Optional[np.ndarray] = None,
 ) -> np.ndarray:
-    # Normalize the quaternion if needed
-    quaternion /= np.linalg.norm(quaternion)
-
-    if ordering == "wxyz":
-        w, x, y, z = quaternion
-    elif ordering == "xyzw":
-        x, y, z, w = quaternion
-    else:
+    """
+    Convert a quaternion to a 3x3 rotation matrix.
+
+    The quaternion is normalized if needed, the input is not modified.
+    Stacks of quaternions with shape (..., 4) are converted at once into
+    rotation matrices with shape (..., 3, 3).
+
+    Parameters:
+        quaternion (numpy.ndarray): The quaternion in the given ordering.
+        out (numpy.ndarray): Optional buffer for the rotation matrix.
+
+    Returns:
+        numpy.ndarray: The rotation matrix.
+    """
+    if ordering not in _QUATERNION_ORDER:
         raise InvalidQuaternionOrderError(
             f"Order {ordering} is not permitted, options are 'xyzw', and 'wxyz'"
         )
-    rotation_matrix = np.array(
-        [
-            [1 - 2 * y**2 - 2 * z**2, 2 * x * y - 2 * w * z, 2 * x * z + 2 * w * y],
-            [2 * x * y + 2 * w * z, 1 - 2 * x**2 - 2 * z**2, 2 * y * z - 2 * w * x],
-            [2 * x * z - 2 * w * y, 2 * y * z + 2 * w * x, 1 - 2 * x**2 - 2 * y**2],
-        ]
+    quaternion = np.asarray(quaternion, dtype=np.float64)
+    # Components in the ordering (x, y, z, w).
+    quaternion_xyzw = quaternion[
+        ..., _QUATERNION_ORDER_INVERSE[ordering][[1, 2, 3, 0]]
+    ]
+    if out is None:
+        out = np.empty(quaternion.shape[:-1] + (3, 3))
+
+    if quat_to_rot is not None:
+        # One kernel call for the whole stack, reshape only copies if out
+        # is a view that cannot be flattened.
+        out_stack = out.reshape(-1, 3, 3)
+        quat_to_rot(quaternion_xyzw.reshape(-1, 4), out_stack)
+        if not np.shares_memory(out_stack, out):
+            out[...] = out_stack.reshape(out.shape)
+        return out
+
+    # Normalize the quaternions if needed.
+    squared_norm = np.sum(quaternion_xyzw * quaternion_xyzw, axis=-1)
+    inverse_norm = np.where(
+        np.abs(squared_norm - 1.0) > 1e-8, 1.0 / np.sqrt(squared_norm), 1.0
     )
-
-    return rotation_matrix
+    quaternion_xyzw = quaternion_xyzw * inverse_norm[..., np.newaxis]
+    vector = quaternion_xyzw[..., :3]
+    w = quaternion_xyzw[..., 3]
+    # R = (w^2 - |v|^2) I + 2 v v^T + 2 w [v]x
+    np.multiply(
+        2.0 * vector[..., :, np.newaxis], vector[..., np.newaxis, :], out=out
+    )
+    diagonal = w * w - np.sum(vector * vector, axis=-1)
+    for i in range(3):
+        out[..., i, i] += diagonal
+    x, y, z = np.moveaxis(2.0 * w[..., np.newaxis] * vector, -1, 0)
+    out[..., 0, 1] -= z
+    out[..., 0, 2] += y
+    out[..., 1, 0] += z
+    out[..., 1, 2] -= x
+    out[..., 2, 0] -= y
+    out[..., 2, 1] += x
+    return out
 
 
 def get_transformation_matrix(
-    quaternion: np.ndarray, translation: np.ndarray
+    quaternion: np.ndarray,
+    translation: np.ndarray,
+    out: Optional[np.ndarray] = None,
 ) -> np.ndarray:
-    rotation = quaternion_to_rotation_matrix(quaternion, ordering="xyzw")
-
-    transformation_matrix = np.eye(4)
-    transformation_matrix[:3, :3] = rotation
-    transformation_matrix[:3, 3] = translation
-
-    return transformation_matrix
-
-def matrix_to_quaternion(matrix, ordering='wxyz') -> tuple:
+    # All entries are written below, the buffer does not need to be zeroed.
+    if out is None:
+        out = np.empty((4, 4))
+    out[3] = _HOMOGENEOUS_ROW
+    quaternion_to_rotation_matrix(quaternion, ordering="xyzw", out=out[:3, :3])
+    out[:3, 3] = translation
+
+    return out
+
+def matrix_to_quaternion(
+    matrix, ordering='wxyz', out: Optional[np.ndarray] = None
+) -> tuple:
     """
     Convert a 4x4 transformation matrix to a quaternion.
 
+    Stacks of matrices with shape (..., 4, 4) are converted at once.
+
     Parameters:
         matrix (numpy.ndarray): The 4x4 transformation matrix.
+        out (numpy.ndarray): Optional buffer for the quaternion.
 
     Returns:
-        numpy.ndarray: The quaternion representation (w, x, y, z).
+        numpy.ndarray: The translation.
+        numpy.ndarray: The quaternion representation in the given ordering.
     """
+    translation = matrix[..., :3, 3]
+    quaternion = rotation_matrix_to_quaternion(
+        matrix[..., :3, :3], ordering, out=out
+    )
+    return translation, quaternion
+
 
-    # Extract the rotation matrix from the transformation matrix
-    rotation_matrix = matrix[:3, :3]
-    translation = matrix[:3, 3]
-
-    # Calculate the trace of the rotation matrix
-    trace = np.trace(rotation_matrix)
-
-    if trace > 0:
-        # The quaternion calculation when the trace is positive
-        s = np.sqrt(trace + 1.0) * 2
-        w = 0.25 * s
-        x = (rotation_matrix[2, 1] - rotation_matrix[1, 2]) / s
-        y = (rotation_matrix[0, 2] - rotation_matrix[2, 0]) / s
-        z = (rotation_matrix[1, 0] - rotation_matrix[0, 1]) / s
-    elif (rotation_matrix[0, 0] > rotation_matrix[1, 1]) and (rotation_matrix[0, 0] > rotation_matrix[2, 2]):
-        # The quaternion calculation when the trace is largest along x-axis
-        s = np.sqrt(
-                1.0
-                + rotation_matrix[0, 0]
-                - rotation_matrix[1, 1]
-                - rotation_matrix[2, 2]
-            ) * 2
-        w = (rotation_matrix[2, 1] - rotation_matrix[1, 2]) / s
-        x = 0.25 * s
-        y = (rotation_matrix[0, 1] + rotation_matrix[1, 0]) / s
-        z = (rotation_matrix[0, 2] + rotation_matrix[2, 0]) / s
-    elif rotation_matrix[1, 1] > rotation_matrix[2, 2]:
-        # The quaternion calculation when the trace is largest along y-axis
-        s = np.sqrt(
-                1.0
-                + rotation_matrix[1, 1]
-                - rotation_matrix[0, 0]
-                - rotation_matrix[2, 2]
-            ) * 2
-        w = (rotation_matrix[0, 2] - rotation_matrix[2, 0]) / s
-        x = (rotation_matrix[0, 1] + rotation_matrix[1, 0]) / s
-        y = 0.25 * s
-        z = (rotation_matrix[1, 2] + rotation_matrix[2, 1]) / s
-    else:
-        # The quaternion calculation when the trace is largest along z-axis
-        s = np.sqrt(
-                1.0
-                + rotation_matrix[2, 2]
-                - rotation_matrix[0, 0]
-                - rotation_matrix[1, 1]
-            ) * 2
-        w = (rotation_matrix[1, 0] - rotation_matrix[0, 1]) / s
-        x = (rotation_matrix[0, 2] + rotation_matrix[2, 0]) / s
-        y = (rotation_matrix[1, 2] + rotation_matrix[2, 1]) / s
-        z = 0.25 * s
-
-    quaternion = np.array([1, 0, 0, 0])
-    if ordering == "wxyz":
-        quaternion = np.array([w, x, y, z])
-    elif ordering == "xyzw":
-        quaternion = np.array([x, y, z, w])
-    else:
+def rotation_matrix_to_quaternion(
+    rotation_matrix: np.ndarray,
+    ordering: str = "wxyz",
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Convert a 3x3 rotation matrix to a quaternion.
+
+    All products 4 * q_i * q_j of the quaternion components (w, x, y, z)
+    are linear in the entries of the rotation matrix. The row of the
+    component with the largest magnitude is selected with argmax instead
+    of branching, and divided by 4 times that component. The table is
+    laid out in the requested ordering, so the selected row is written
+    into the result without reordering. Stacks of matrices with shape
+    (..., 3, 3) are converted at once.
+
+    Parameters:
+        rotation_matrix (numpy.ndarray): The 3x3 rotation matrix.
+        out (numpy.ndarray): Optional buffer for the quaternion.
+
+    Returns:
+        numpy.ndarray: The quaternion representation in the given ordering.
+    """
+    if ordering not in _QUATERNION_ORDER:
         raise InvalidQuaternionOrderError(
             f"Order {ordering} is not permitted, options are 'xyzw', and 'wxyz'"
         )
 
-    return translation, quaternion
+    r = rotation_matrix
+    # Positions of the components (w, x, y, z) in the requested ordering.
+    w, x, y, z = _QUATERNION_ORDER_INVERSE[ordering]
+
+    trace = np.trace(rotation_matrix, axis1=-2, axis2=-1)
+    products = np.empty(rotation_matrix.shape[:-2] + (4, 4))
+    products[..., w, w] = 1.0 + trace
+    products[..., x, x] = 1.0 + 2 * r[..., 0, 0] - trace
+    products[..., y, y] = 1.0 + 2 * r[..., 1, 1] - trace
+    products[..., z, z] = 1.0 + 2 * r[..., 2, 2] - trace
+    products[..., w, x] = products[..., x, w] = r[..., 2, 1] - r[..., 1, 2]
+    products[..., w, y] = products[..., y, w] = r[..., 0, 2] - r[..., 2, 0]
+    products[..., w, z] = products[..., z, w] = r[..., 1, 0] - r[..., 0, 1]
+    products[..., x, y] = products[..., y, x] = r[..., 0, 1] + r[..., 1, 0]
+    products[..., x, z] = products[..., z, x] = r[..., 0, 2] + r[..., 2, 0]
+    products[..., y, z] = products[..., z, y] = r[..., 1, 2] + r[..., 2, 1]
+
+    squares = np.diagonal(products, axis1=-2, axis2=-1)
+    index = np.argmax(squares, axis=-1)[..., np.newaxis]
+    row = np.take_along_axis(
+        products, index[..., np.newaxis], axis=-2
+    )[..., 0, :]
+    s = 2 * np.sqrt(np.take_along_axis(squares, index, axis=-1))
+    return np.divide(row, s, out=out)
 
 
 class WrongObservationError(Exception):
@@ -162,6 +231,138 @@ def check_observation(obs, ob):
             raise Exception(f"Observation checking failed for key:{key} value:{value}.")
 
 
+def _first_out_of_bounds_loop(value, low, high):
+    """Returns the index of the first entry outside [low, high], -1 if all
+    entries are inside. NaN entries count as outside, as in Box.contains.
+    """
+    for i in range(value.shape[0]):
+        if not (low[i] <= value[i] <= high[i]):
+            return i
+    return -1
+
+
+# Not compiled with fastmath, it would drop the NaN handling.
+_first_out_of_bounds_kernel = None
+if njit is not None:
+    _first_out_of_bounds_kernel = njit(cache=True)(_first_out_of_bounds_loop)
+
+
+def values_in_bounds(
+    value: np.ndarray, low: np.ndarray, high: np.ndarray
+) -> bool:
+    """Checks whether all values lie in [low, high], the shapes must match.
+
+    With numba, the bounds are checked in a single compiled loop.
+    """
+    if _first_out_of_bounds_kernel is not None:
+        return (
+            _first_out_of_bounds_kernel(
+                np.ravel(value), low.ravel(), high.ravel()
+            )
+            < 0
+        )
+    return bool(np.all((low <= value) & (value <= high)))
+
+
+def observation_space_leaves(space: gym.spaces.Dict, path: tuple = ()) -> list:
+    """Flattens a nested observation space into its Box leaves.
+
+    Each leaf is returned as (path, low, high), where path is the tuple of
+    keys leading to the leaf in the observation dictionary.
+    """
+    leaves = []
+    for key, subspace in space.spaces.items():
+        if isinstance(subspace, gym.spaces.Dict):
+            leaves.extend(observation_space_leaves(subspace, path + (key,)))
+        elif isinstance(subspace, gym.spaces.Box):
+            leaves.append((path + (key,), subspace.low, subspace.high))
+    return leaves
+
+
+def observation_in_bounds(observation: dict, leaves: list) -> bool:
+    """Checks shape and bounds of all leaves in a single pass.
+
+    Returns False on the first violation, the detailed error message is
+    only built by check_observation in that case.
+    """
+    for path, low, high in leaves:
+        value = observation
+        try:
+            for key in path:
+                value = value[key]
+        except (KeyError, TypeError):
+            return False
+        if np.shape(value) != low.shape or not values_in_bounds(
+            value, low, high
+        ):
+            return False
+    return True
+
+
+def _create_sphere(size: list, color: list, position: tuple) -> tuple:
+    shape_id = p.createCollisionShape(p.GEOM_SPHERE, radius=size[0])
+    visual_shape_id = p.createVisualShape(
+        p.GEOM_SPHERE,
+        rgbaColor=color,
+        specularColor=[1.0, 0.5, 0.5],
+        radius=size[0],
+    )
+    return shape_id, visual_shape_id, position
+
+
+def _create_box(size: list, color: list, position: tuple) -> tuple:
+    half_extens = [s / 2 for s in size]
+    position = [position[i] - size[i] for i in range(3)]
+    shape_id = p.createCollisionShape(p.GEOM_BOX, halfExtents=half_extens)
+    visual_shape_id = p.createVisualShape(
+        p.GEOM_BOX,
+        rgbaColor=color,
+        specularColor=[1.0, 0.5, 0.5],
+        halfExtents=half_extens,
+    )
+    return shape_id, visual_shape_id, position
+
+
+def _create_cylinder(size: list, color: list, position: tuple) -> tuple:
+    shape_id = p.createCollisionShape(
+        p.GEOM_CYLINDER, radius=size[0], height=size[1]
+    )
+    visual_shape_id = p.createVisualShape(
+        p.GEOM_CYLINDER,
+        rgbaColor=color,
+        specularColor=[1.0, 0.5, 0.5],
+        radius=size[0],
+        length=size[1],
+    )
+    return shape_id, visual_shape_id, position
+
+
+def _create_capsule(size: list, color: list, position: tuple) -> tuple:
+    shape_id = p.createCollisionShape(
+        p.GEOM_CAPSULE, radius=size[0], height=size[1]
+    )
+    visual_shape_id = p.createVisualShape(
+        p.GEOM_CAPSULE,
+        rgbaColor=color,
+        specularColor=[1.0, 0.5, 0.5],
+        radius=size[0],
+        length=size[1],
+    )
+    return shape_id, visual_shape_id, position
+
+
+# Functions creating the collision and visual shape of the primitive shape
+# types, returning them with the base position of the body.
+_SHAPE_FACTORIES = {
+    "sphere": _create_sphere,
+    "splineSphere": _create_sphere,
+    "analyticSphere": _create_sphere,
+    "box": _create_box,
+    "cylinder": _create_cylinder,
+    "capsule": _create_capsule,
+}
+
+
 class UrdfEnv(gym.Env):
     """Generic urdf-environment for OpenAI-Gym"""
 
@@ -188,16 +389,37 @@ class UrdfEnv(gym.Env):
         self._dt: float = dt
         self._t: float = 0.0
         self._robots: List[GenericRobot] = robots
+        self._n_robots: int = len(robots)
         self._render: bool = render
         self._done: bool = False
         self._info: dict = {}
         self._num_sub_steps: float = 20
+        self._last_tick: float = time.perf_counter()
         self._obsts: dict = {}
-        self._collision_links: dict = {}
+        self._static_obsts: List[tuple] = []
+        self._dynamic_obsts: List[tuple] = []
+        self._collision_link_ids: List[int] = []
+        self._has_collision_links: bool = False
+        self._collision_link_sources: List[tuple] = []
+        self._collision_link_keys: List[str] = []
+        self._collision_link_rotations: np.ndarray = np.empty((0, 3, 3))
+        self._collision_link_translations: np.ndarray = np.empty((0, 3))
+        self._link_rotations: np.ndarray = np.empty((0, 3, 3))
+        self._link_positions: np.ndarray = np.empty((0, 3))
+        self._link_orientations: np.ndarray = np.empty((0, 4))
+        self._total_rotations: np.ndarray = np.empty((0, 3, 3))
+        self._total_translations: np.ndarray = np.empty((0, 3))
+        self._total_orientations: np.ndarray = np.empty((0, 4))
+        self._n_updated_collision_links: int = 0
         self._collision_links_poses: dict = {}
+        self._collision_links_poses_outdated: bool = False
+        self._collision_links_positions: Optional[dict] = None
         self._goals: dict = {}
+        self._static_goals: List[tuple] = []
+        self._dynamic_goals: List[tuple] = []
         self._space_set = False
         self._observation_checking = observation_checking
+        self._check_observation: bool = False
         self._reward_calculator = None
         self.sensors = (
             []
@@ -213,7 +435,6 @@ class UrdfEnv(gym.Env):
         self.plane = Plane()
         p.setGravity(0, 0, -10.0)
         self._obsts = {}
-        self._collision_links = {}
         self._goals = {}
         self.set_spaces()
 
@@ -278,6 +499,7 @@ class UrdfEnv(gym.Env):
         action_space_as_dict = {}
 
         for i, robot in enumerate(self._robots):
+            robot_key = f"robot_{i}"
             (obs_space_robot_i, action_space_robot_i) = robot.get_spaces()
             obs_space_robot_i = dict(obs_space_robot_i)
             for sensor in robot._sensors:
@@ -287,30 +509,44 @@ class UrdfEnv(gym.Env):
                 obs_space_robot_i.update(
                     sensor.get_observation_space(self._obsts, self._goals)
                 )
-            observation_space_as_dict[f"robot_{i}"] = gym.spaces.Dict(obs_space_robot_i)
-            action_space_as_dict[f"robot_{i}"] = action_space_robot_i
+            observation_space_as_dict[robot_key] = gym.spaces.Dict(obs_space_robot_i)
+            action_space_as_dict[robot_key] = action_space_robot_i
 
         self.observation_space = gym.spaces.Dict(observation_space_as_dict)
+        self._observation_leaves = observation_space_leaves(
+            self.observation_space
+        )
+        self._check_observation = self._observation_checking
         action_space = gym.spaces.Dict(action_space_as_dict)
         self.action_space = gym.spaces.flatten_space(action_space)
+        self._n_actions = int(np.prod(self.action_space.shape))
+        self._action_low = self.action_space.low
+        self._action_high = self.action_space.high
+        action_offsets = np.cumsum([0] + self.n_per_robot())
+        self._action_slices = [
+            slice(start, end)
+            for start, end in zip(action_offsets[:-1], action_offsets[1:])
+        ]
 
     def step(self, action):
-        self._t += self.dt()
+        dt = self._dt
+        self._t += dt
+        t = self._t
         # Feed action to the robot and get observation of robot's state
 
-        if not self.action_space.contains(action):
+        if np.shape(action) != (self._n_actions,) or not values_in_bounds(
+            action, self._action_low, self._action_high
+        ):
             self._done = True
             self._info = {"action_limits": f"{action} not in {self.action_space}"}
 
-        action_id = 0
-        for robot in self._robots:
-            action_robot = action[action_id : action_id + robot.n()]
-            robot.apply_action(action_robot, self.dt())
-            action_id += robot.n()
+        for robot, action_slice in zip(self._robots, self._action_slices):
+            robot.apply_action(action[action_slice], dt)
 
-        self.update_obstacles()
-        self.update_goals()
-        self.update_collision_links()
+        self.update_obstacles(t)
+        self.update_goals(t)
+        if self._has_collision_links:
+            self.update_collision_links()
         p.stepSimulation(self._cid)
         ob = self._get_ob()
 
@@ -336,14 +572,11 @@ class UrdfEnv(gym.Env):
         """Compose the observation."""
         observation = {}
         for i, robot in enumerate(self._robots):
-            obs = robot.get_observation(self._obsts, self._goals, self.t())
+            obs = robot.get_observation(self._obsts, self._goals, self._t)
 
             observation[f"robot_{i}"] = obs
-        if hasattr(self, "observation_space"):
-            if (
-                not self.observation_space.contains(observation)
-                and self._observation_checking
-            ):
+        if self._check_observation:
+            if not observation_in_bounds(observation, self._observation_leaves):
                 try:
                     check_observation(self.observation_space, observation)
                 except WrongObservationError as e:
@@ -356,6 +589,7 @@ class UrdfEnv(gym.Env):
         for obst_id, obst in self._obsts.items():
             obst.shuffle()
             obstacle_dict[obst.name()] = obst.dict()
+        self.follow_trajectories(self._static_obsts)
         self.update_obstacles()
         return obstacle_dict
 
@@ -364,6 +598,7 @@ class UrdfEnv(gym.Env):
         for goal_id, goal in self._goals.items():
             goal.shuffle()
             goal_dict[goal.name()] = goal.dict()
+        self.follow_trajectories(self._static_goals)
         self.update_goals()
         return goal_dict
 
@@ -371,57 +606,138 @@ class UrdfEnv(gym.Env):
         for goal_id in self._goals.keys():
             p.removeBody(goal_id)
         self._goals = {}
+        self._static_goals = []
+        self._dynamic_goals = []
         for obst_id in self._obsts.keys():
             p.removeBody(obst_id)
         self._obsts = {}
+        self._static_obsts = []
+        self._dynamic_obsts = []
+
+    @staticmethod
+    def trajectory_entry(bullet_id: int, item) -> Optional[tuple]:
+        """Returns the entry used to move a body along the trajectory of an
+        obstacle or goal.
+
+        The entry holds the bullet id and the bound position and velocity
+        methods of the item. None is returned if the item cannot be
+        evaluated at a time or does not return 3d positions and velocities,
+        e.g. urdf obstacles, goal compositions or joint space goals.
+        """
+        try:
+            position = item.position(t=0.0)
+            velocity = item.velocity(t=0.0)
+        except (AttributeError, TypeError):
+            return None
+        for value in (position, velocity):
+            if not (isinstance(value, np.ndarray) and value.shape == (3,)):
+                return None
+        return (bullet_id, item.position, item.velocity)
+
+    def follow_trajectories(
+        self, entries: List[tuple], t: Optional[float] = None
+    ) -> None:
+        if t is None:
+            t = self._t
+        # Evaluate all trajectories before resetting the bodies in bullet.
+        states = [
+            (bullet_id, position(t=t).tolist(), velocity(t=t).tolist())
+            for bullet_id, position, velocity in entries
+        ]
+        reset_pose = p.resetBasePositionAndOrientation
+        reset_velocity = p.resetBaseVelocity
+        for bullet_id, pos, vel in states:
+            reset_pose(bullet_id, pos, _IDENTITY_ORIENTATION)
+            reset_velocity(bullet_id, linearVelocity=vel)
 
-    def update_obstacles(self):
-        for obst_id, obst in self._obsts.items():
-            if obst.movable():
-                continue
-            try:
-                pos = obst.position(t=self.t()).tolist()
-                vel = obst.velocity(t=self.t()).tolist()
-                ori = [0, 0, 0, 1]
-                p.resetBasePositionAndOrientation(obst_id, pos, ori)
-                p.resetBaseVelocity(obst_id, linearVelocity=vel)
-            except Exception:
-                continue
+    def update_obstacles(self, t: Optional[float] = None):
+        self.follow_trajectories(self._dynamic_obsts, t)
 
     def update_collision_links(self) -> None:
-        for visual_shape_id, info in self._collision_links.items():
-            link_state = p.getLinkState(info[0], info[1])
-            link_position = link_state[0]
-            link_ori = np.array(link_state[1])
-            transformation_matrix = get_transformation_matrix(link_ori, link_position)
-            total_transformation = np.dot(transformation_matrix, info[2])
-            self._collision_links_poses[f"{info[3]}_{info[1]}_{info[4]}"] = total_transformation
-            translation, rotation = matrix_to_quaternion(total_transformation, ordering='xyzw')
-            p.resetBasePositionAndOrientation(
-                visual_shape_id, translation, rotation
-            )
+        """Moves the collision links along with the links of the robots.
+
+        The pose of a collision link is the pose of its robot link composed
+        with its fixed transformation, R = R_link R_local and
+        t = R_link t_local + t_link. The homogeneous matrices returned by
+        collision_links_poses are only assembled when requested.
+        """
+        link_rotations = self._link_rotations
+        link_positions = self._link_positions
+        link_orientations = self._link_orientations
+        for i, source in enumerate(self._collision_link_sources):
+            link_state = p.getLinkState(*source)
+            link_positions[i] = link_state[0]
+            link_orientations[i] = link_state[1]
+        quaternion_to_rotation_matrix(
+            link_orientations, ordering="xyzw", out=link_rotations
+        )
+        np.matmul(
+            link_rotations,
+            self._collision_link_rotations,
+            out=self._total_rotations,
+        )
+        np.einsum(
+            "nij,nj->ni",
+            link_rotations,
+            self._collision_link_translations,
+            out=self._total_translations,
+        )
+        self._total_translations += link_positions
+        if self._n_updated_collision_links != len(self._collision_link_ids):
+            self._n_updated_collision_links = len(self._collision_link_ids)
+            self._collision_links_positions = None
+        self._collision_links_poses_outdated = True
+        rotations = rotation_matrix_to_quaternion(
+            self._total_rotations,
+            ordering="xyzw",
+            out=self._total_orientations,
+        )
+        reset_pose = p.resetBasePositionAndOrientation
+        for bullet_id, translation, rotation in zip(
+            self._collision_link_ids,
+            self._total_translations.tolist(),
+            rotations.tolist(),
+        ):
+            reset_pose(bullet_id, translation, rotation)
 
     def collision_links_poses(self, position_only: bool=False) -> dict:
+        """Returns the poses of the collision links by their keys.
+
+        The poses are homogeneous transformation matrices, None for links
+        that have not been updated yet. With position_only, the positions
+        are returned as read-only views that are updated in place on every
+        step, copy them to keep the position of a certain step. Adding a
+        collision link reallocates the positions, views returned before
+        add_collision_link are no longer updated and have to be requested
+        again.
+        """
         if position_only:
-            result_dict = {}
-            for key, value in self._collision_links_poses.items():
-                if value is None:
-                    result_dict[key] = None
-                elif isinstance(value, np.ndarray):
-                    result_dict[key] = value[0:3, 3]
-            return result_dict
+            if self._collision_links_positions is None:
+                positions = {}
+                for i, key in enumerate(self._collision_link_keys):
+                    if i < self._n_updated_collision_links:
+                        position = self._total_translations[i]
+                        position.setflags(write=False)
+                        positions[key] = position
+                    else:
+                        positions[key] = None
+                self._collision_links_positions = positions
+            return dict(self._collision_links_positions)
+        if self._collision_links_poses_outdated:
+            n_links = self._n_updated_collision_links
+            transformations = np.empty((n_links, 4, 4))
+            transformations[:, :3, :3] = self._total_rotations[:n_links]
+            transformations[:, :3, 3] = self._total_translations[:n_links]
+            transformations[:, 3] = _HOMOGENEOUS_ROW
+            for key, transformation in zip(
+                self._collision_link_keys, transformations
+            ):
+                self._collision_links_poses[key] = transformation
+            self._collision_links_poses_outdated = False
         return self._collision_links_poses
 
-    def update_goals(self):
-        for goal_id, goal in self._goals.items():
-            try:
-                pos = goal.position(t=self.t()).tolist()
-                vel = goal.velocity(t=self.t()).tolist()
-                ori = [0, 0, 0, 1]
-                p.resetBasePositionAndOrientation(goal_id, pos, ori)
-                p.resetBaseVelocity(goal_id, linearVelocity=vel)
-            except Exception:
-                continue
+    def update_goals(self, t: Optional[float] = None):
+        self.follow_trajectories(self._dynamic_goals, t)
 
     def add_obstacle(self, obst: CollisionObstacle) -> None:
         """Adds obstacle to the simulation environment.
@@ -443,6 +759,15 @@ class UrdfEnv(gym.Env):
                 movable=obst.movable(),
             )
         self._obsts[obst_id] = obst
+        entry = None
+        if not obst.movable():
+            entry = self.trajectory_entry(obst_id, obst)
+        if entry is not None:
+            if isinstance(obst, DynamicObstacle):
+                self._dynamic_obsts.append(entry)
+            else:
+                self._static_obsts.append(entry)
+                self.follow_trajectories([entry])
         if self._t != 0.0:
             warnings.warn("Adding an object while the simulation already started")
 
@@ -454,16 +779,18 @@ class UrdfEnv(gym.Env):
             else:
                 pos = obstacle.position(t=0).tolist()
                 vel = obstacle.velocity(t=0).tolist()
-            ori = [0, 0, 0, 1]
-            p.resetBasePositionAndOrientation(obst_id, pos, ori)
+            p.resetBasePositionAndOrientation(
+                obst_id, pos, _IDENTITY_ORIENTATION
+            )
             p.resetBaseVelocity(obst_id, linearVelocity=vel)
 
     def reset_goals(self) -> None:
         for goal_id, goal in self._goals.items():
             pos = goal.position(t=0).tolist()
             vel = goal.velocity(t=0).tolist()
-            ori = [0, 0, 0, 1]
-            p.resetBasePositionAndOrientation(goal_id, pos, ori)
+            p.resetBasePositionAndOrientation(
+                goal_id, pos, _IDENTITY_ORIENTATION
+            )
             p.resetBaseVelocity(goal_id, linearVelocity=vel)
 
     def get_obstacles(self) -> dict:
@@ -490,19 +817,40 @@ class UrdfEnv(gym.Env):
                 with_collision_shape=False,
             )
 
-        self._collision_links[bullet_id] = (
-            self._robots[robot_index]._robot,
-            link_index,
-            link_transformation,
+        key = f"{robot_index}_{link_index}_{sphere_on_link_index}"
+        self._collision_links_poses[key] = None
+        self._collision_link_ids.append(bullet_id)
+        self._has_collision_links = True
+        self._collision_link_sources.append(
+            (self._robots[robot_index]._robot, link_index)
+        )
+        self._collision_link_keys.append(key)
+        self._collision_link_rotations = np.concatenate(
+            (
+                self._collision_link_rotations,
+                link_transformation[np.newaxis, :3, :3],
+            )
+        )
+        self._collision_link_translations = np.concatenate(
+            (
+                self._collision_link_translations,
+                link_transformation[np.newaxis, :3, 3],
+            )
         )
-        self._collision_links_poses[f"{robot_index}_{link_index}_{sphere_on_link_index}"] = None
-        self._collision_links[bullet_id] = (
-            self._robots[robot_index]._robot,
-            link_index,
-            link_transformation,
-            robot_index,
-            sphere_on_link_index,
+        # The per link buffers are overwritten on every update, the poses
+        # of the links updated so far are kept for collision_links_poses.
+        n_links = len(self._collision_link_ids)
+        self._link_rotations = np.empty((n_links, 3, 3))
+        self._link_positions = np.empty((n_links, 3))
+        self._link_orientations = np.empty((n_links, 4))
+        self._total_rotations = np.concatenate(
+            (self._total_rotations, np.empty((1, 3, 3)))
         )
+        self._total_translations = np.concatenate(
+            (self._total_translations, np.empty((1, 3)))
+        )
+        self._total_orientations = np.empty((n_links, 4))
+        self._collision_links_positions = None
         return bullet_id
 
     def add_sub_goal(self, goal: SubGoal) -> int:
@@ -546,6 +894,14 @@ class UrdfEnv(gym.Env):
         else:
             goal_id = self.add_sub_goal(goal)
             self._goals[goal_id] = goal
+            entry = self.trajectory_entry(goal_id, goal)
+            if entry is None:
+                return
+            if isinstance(goal, DynamicSubGoal):
+                self._dynamic_goals.append(entry)
+            else:
+                self._static_goals.append(entry)
+                self.follow_trajectories([entry])
 
     def add_shape(
         self,
@@ -561,57 +917,18 @@ class UrdfEnv(gym.Env):
     ) -> int:
 
         mass = float(movable)
-        if shape_type in ["sphere", "splineSphere", "analyticSphere"]:
-            shape_id = p.createCollisionShape(p.GEOM_SPHERE, radius=size[0])
-            visual_shape_id = p.createVisualShape(
-                p.GEOM_SPHERE,
-                rgbaColor=color,
-                specularColor=[1.0, 0.5, 0.5],
-                radius=size[0],
-            )
-
-        elif shape_type == "box":
-            half_extens = [s / 2 for s in size]
-            position = [position[i] - size[i] for i in range(3)]
-            shape_id = p.createCollisionShape(p.GEOM_BOX, halfExtents=half_extens)
-            visual_shape_id = p.createVisualShape(
-                p.GEOM_BOX,
-                rgbaColor=color,
-                specularColor=[1.0, 0.5, 0.5],
-                halfExtents=half_extens,
-            )
-
-        elif shape_type == "cylinder":
-            shape_id = p.createCollisionShape(
-                p.GEOM_CYLINDER, radius=size[0], height=size[1]
-            )
-            visual_shape_id = p.createVisualShape(
-                p.GEOM_CYLINDER,
-                rgbaColor=color,
-                specularColor=[1.0, 0.5, 0.5],
-                radius=size[0],
-                length=size[1],
-            )
-
-        elif shape_type == "capsule":
-            shape_id = p.createCollisionShape(
-                p.GEOM_CAPSULE, radius=size[0],height=size[1]
-            )
-            visual_shape_id = p.createVisualShape(
-                p.GEOM_CAPSULE,
-                rgbaColor=color,
-                specularColor=[1.0, 0.5, 0.5],
-                radius=size[0],
-                length=size[1],
-            )
-        elif shape_type == "urdf":
+        if shape_type == "urdf":
             shape_id = p.loadURDF(
                 fileName=urdf, basePosition=position, globalScaling=scaling
             )
             return shape_id
-        else:
-            warnings.warn("Unknown shape type: {shape_type}, aborting...")
+        shape_factory = _SHAPE_FACTORIES.get(shape_type)
+        if shape_factory is None:
+            warnings.warn(f"Unknown shape type: {shape_type}, aborting...")
             return -1
+        shape_id, visual_shape_id, position = shape_factory(
+            size, color, position
+        )
         if not with_collision_shape:
             shape_id = -1
         bullet_id = p.createMultiBody(
@@ -659,19 +976,19 @@ class UrdfEnv(gym.Env):
         super().reset(seed=seed, options=options)
         self._t = 0.0
         if mount_positions is None:
-            mount_positions = np.tile(np.zeros(3), (len(self._robots), 1))
+            mount_positions = np.tile(np.zeros(3), (self._n_robots, 1))
         self.mount_positions = mount_positions
         if mount_orientations is None:
             mount_orientations = np.tile(
-                np.array([0.0, 0.0, 0.0, 1.0]), (len(self._robots), 1)
+                np.array([0.0, 0.0, 0.0, 1.0]), (self._n_robots, 1)
             )
         if pos is None:
-            pos = np.tile(None, len(self._robots))
+            pos = np.tile(None, self._n_robots)
         if vel is None:
-            vel = np.tile(None, len(self._robots))
-        if len(pos.shape) == 1 and len(self._robots) == 1:
+            vel = np.tile(None, self._n_robots)
+        if len(pos.shape) == 1 and self._n_robots == 1:
             pos = np.tile(pos, (1, 1))
-        if len(vel.shape) == 1 and len(self._robots) == 1:
+        if len(vel.shape) == 1 and self._n_robots == 1:
             vel = np.tile(vel, (1, 1))
         for i, robot in enumerate(self._robots):
             checked_position, checked_velocity = robot.check_state(pos[i], vel[i])
@@ -683,6 +1000,7 @@ class UrdfEnv(gym.Env):
             )
         self.reset_obstacles()
         self.reset_goals()
+        self._last_tick = time.perf_counter()
         return self._get_ob(), self._info
 
     def render(self) -> None:
@@ -691,9 +1009,14 @@ class UrdfEnv(gym.Env):
         As rendering is done rather by the self._render flag,
         only the sleep statement is called here. This speeds up
         the simulation when rendering is not desired.
+        The time already spent since the previous step is subtracted
+        from the sleep, so the simulation runs in real time as long as
+        a step takes less than dt.
 
         """
-        time.sleep(self.dt())
+        elapsed = time.perf_counter() - self._last_tick
+        time.sleep(max(0.0, self._dt - elapsed))
+        self._last_tick = time.perf_counter()
 
     def close(self) -> None:
         p.disconnect(self._cid)